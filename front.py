@@ -1,52 +1,122 @@
-import gradio as gr
+from __future__ import annotations
+
 import os
-import json
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, TYPE_CHECKING
 import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+# gradio takes seconds to import, so it is only imported where the UI needs it
+if TYPE_CHECKING:
+    import gradio as gr
+
 # Import the modules we've implemented
+from jsonio import dump_json, load_json, write_atomic
 from api_handlers import validate_api_keys, save_api_keys, load_api_keys
-from auth_handlers import authorize_platform, authorize_all_platforms, check_auth_status
-from post_handlers import post_to_platforms, format_post_for_platform, save_draft, load_drafts
+from auth_handlers import authorize_platform, authorize_all_platforms, check_auth_status_batch
+from post_handlers import post_to_platforms, format_post_for_platform, save_draft, load_drafts, load_draft
 
 # Constants
-PLATFORMS = ["X (Twitter)", "Threads", "Bluesky", "Mastodon", "LinkedIn"]
+PLATFORMS = ("X (Twitter)", "Threads", "Bluesky", "Mastodon", "LinkedIn")
+# Position of each platform in PLATFORMS (read-only)
+_PLATFORM_INDEX = MappingProxyType({platform: i for i, platform in enumerate(PLATFORMS)})
+
+# Number of API key inputs each platform has in the form, in PLATFORMS order
+_API_KEY_SCHEMA = tuple((platform, 4 if platform == "X (Twitter)" else 1) for platform in PLATFORMS)
+_API_KEY_INPUT_COUNT = sum(input_count for _, input_count in _API_KEY_SCHEMA)
+
+# Per-platform flags are stored as int bitmasks: bit i is set for PLATFORMS[i]
+def _mask_has(mask: int, platform: str) -> bool:
+    """Tests a platform's bit."""
+    return bool(mask >> _PLATFORM_INDEX[platform] & 1)
+
+def _mask_with(mask: int, platform: str, value: bool) -> int:
+    """Returns mask with a platform's bit set to value."""
+    bit = 1 << _PLATFORM_INDEX[platform]
+    return mask | bit if value else mask & ~bit
+
+def _platforms_in(mask: int) -> List[str]:
+    """Lists the platforms whose bits are set, in PLATFORMS order."""
+    return [platform for i, platform in enumerate(PLATFORMS) if mask >> i & 1]
+
+def _mask_to_dict(mask: int) -> Dict[str, bool]:
+    """Expands a mask into {platform: flag}, the format saved in CONFIG_FILE."""
+    return {platform: bool(mask >> i & 1) for i, platform in enumerate(PLATFORMS)}
+
+def _mask_from_dict(flags: Dict[str, bool]) -> int:
+    """Packs {platform: flag} into a mask, ignoring unknown platforms."""
+    mask = 0
+    for platform, value in flags.items():
+        if value and platform in _PLATFORM_INDEX:
+            mask |= 1 << _PLATFORM_INDEX[platform]
+    return mask
 CONFIG_FILE = "user_config.json"
 DRAFTS_DIR = "drafts" # Define drafts directory constant
 
+def _status_markdown(result: Dict[str, Any]) -> str:
+    """Renders a handler result dict as a status message, with a link to each successful post."""
+    if result.get("success"):
+        links = [
+            f"- [{platform}]({res['post_url']})"
+            for platform, res in result.get("results", {}).items()
+            if res.get("success") and res.get("post_url")
+        ]
+        status = "✅ " + result.get("message", "Done.")
+        return status + "\n\n" + "\n".join(links) if links else status
+    return "❌ " + (result.get("message") or result.get("error") or "Unknown error")
+
 class SimulpostApp:
     def __init__(self):
         """Initialize the Simulpost application with default state."""
-        self.selected_platforms = {platform: False for platform in PLATFORMS}
+        self._selected_mask = 0
         self.api_keys = {platform: "" for platform in PLATFORMS}
-        self.authorized_platforms = {platform: False for platform in PLATFORMS}
+        self._authorized_mask = 0
 
         # Ensure drafts directory exists
-        if not os.path.exists(DRAFTS_DIR):
-            os.makedirs(DRAFTS_DIR)
-
-        # Load saved configuration if it exists
-        self.load_config()
+        os.makedirs(DRAFTS_DIR, exist_ok=True)
+
+        # The three startup reads are independent, so overlap them
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            # Load saved configuration if it exists
+            config_future = executor.submit(self.load_config)
+            # Load saved API keys (decrypted)
+            keys_future = executor.submit(load_api_keys)
+            # Check authorization status for all platforms with a single read of the token file
+            statuses_future = executor.submit(check_auth_status_batch, PLATFORMS)
+            config_future.result()
+            saved_api_keys = keys_future.result()
+            auth_statuses = statuses_future.result()
 
-        # Load saved API keys (decrypted)
-        saved_api_keys = load_api_keys()
         for platform, api_key in saved_api_keys.items():
             if platform in self.api_keys:
                 self.api_keys[platform] = api_key
 
-        # Check authorization status for each platform (uses load_auth_tokens internally)
-        for platform in PLATFORMS:
-            auth_status = check_auth_status(platform)
-            self.authorized_platforms[platform] = auth_status.get("authorized", False)
+        # The live token status takes precedence over the authorized flags saved in the config
+        self._authorized_mask = _mask_from_dict(
+            {platform: status.get("authorized", False) for platform, status in auth_statuses.items()}
+        )
+
+    @property
+    def selected_platforms(self) -> Dict[str, bool]:
+        """Selection state as {platform: selected} (a fresh copy)."""
+        return _mask_to_dict(self._selected_mask)
+
+    @property
+    def authorized_platforms(self) -> Dict[str, bool]:
+        """Authorization state as {platform: authorized} (a fresh copy)."""
+        return _mask_to_dict(self._authorized_mask)
 
     def load_config(self):
         """Load user configuration from file if it exists."""
         if os.path.exists(CONFIG_FILE):
             try:
-                with open(CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
-                    self.selected_platforms = config.get('selected_platforms', self.selected_platforms)
+                with open(CONFIG_FILE, 'rb') as f:
+                    config = load_json(f.read())
+                    if 'selected_platforms' in config:
+                        self._selected_mask = _mask_from_dict(config['selected_platforms'])
                     # We don't load API keys from config for security
-                    self.authorized_platforms = config.get('authorized_platforms', self.authorized_platforms)
+                    if 'authorized_platforms' in config:
+                        self._authorized_mask = _mask_from_dict(config['authorized_platforms'])
             except Exception as e:
                 print(f"Error loading configuration: {e}")
 
@@ -58,22 +128,21 @@ class SimulpostApp:
             # We don't save API keys to config for security
         }
         try:
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(config, f)
+            # Written atomically so a crash mid-save can't leave a truncated config
+            write_atomic(CONFIG_FILE, dump_json(config))
         except Exception as e:
             print(f"Error saving configuration: {e}")
 
     def update_platform_selection(self, *args):
         """Update the selected platforms based on checkbox inputs."""
+        import gradio as gr
         # args correspond to checkbox values in PLATFORMS order
-        updated_selection = {}
-        visibility_updates = []
-        for i, platform in enumerate(PLATFORMS):
+        visibility_updates = [None] * len(PLATFORMS)
+        for platform, i in _PLATFORM_INDEX.items():
              is_selected = args[i]
-             self.selected_platforms[platform] = is_selected
-             updated_selection[platform] = is_selected
+             self._selected_mask = _mask_with(self._selected_mask, platform, is_selected)
              # Determine visibility update for the corresponding API key input group/textbox
-             visibility_updates.append(gr.update(visible=is_selected))
+             visibility_updates[i] = gr.update(visible=is_selected)
 
         # The function needs to return updates for all visibility-controlled components
         return visibility_updates
@@ -93,56 +162,35 @@ class SimulpostApp:
         """Handle API key submission and validation.
 
         Args:
-            *args: API key inputs flattened for all platforms. Order matters!
+            *args: The platform checkbox values (in PLATFORMS order), followed by the
+                   API key inputs flattened for all platforms. Order matters!
 
         Returns:
             Dict: Status and information for the next screen
         """
-        current_keys = {}
-        arg_index = 0
-
-        # Process inputs for each platform based on PLATFORMS order
-        for platform in PLATFORMS:
-            if self.selected_platforms[platform]:
-                if platform == "X (Twitter)":
-                     # Expect 4 inputs if Twitter is selected
-                    if arg_index + 4 > len(args):
-                         return {"success": False, "message": "Internal error: Mismatched argument count for Twitter."}
-                    api_key = args[arg_index]
-                    api_secret = args[arg_index + 1]
-                    access_token = args[arg_index + 2]
-                    access_secret = args[arg_index + 3]
-
-                    # Check if all required fields are provided (only if selected)
-                    if not (api_key and api_secret and access_token and access_secret):
-                        return {
-                            "success": False,
-                            "message": f"Please provide all four credentials for {platform}"
-                        }
-                    current_keys[platform] = f"{api_key},{api_secret},{access_token},{access_secret}"
-                    arg_index += 4
+        if len(args) != len(PLATFORMS) + _API_KEY_INPUT_COUNT:
+            return {"success": False, "message": "Internal error: Mismatched argument count."}
+
+        # The checkboxes only toggle visibility in the browser, so take the selection from them here
+        self._selected_mask = _mask_from_dict(dict(zip(PLATFORMS, args)))
+
+        # Single pass over the inputs: every platform's fields are always passed, so
+        # consume them in schema order and keep only those of selected platforms
+        key_inputs = iter(args[len(PLATFORMS):])
+        selected_api_keys = {}
+        for platform, input_count in _API_KEY_SCHEMA:
+            values = list(itertools.islice(key_inputs, input_count))
+            if not _mask_has(self._selected_mask, platform):
+                continue
+            # Check if all required fields are provided (only if selected)
+            if not all(values):
+                if input_count > 1:
+                    message = f"Please provide all {input_count} credentials for {platform}"
                 else:
-                     # Expect 1 input for other selected platforms
-                    if arg_index >= len(args):
-                        return {"success": False, "message": "Internal error: Mismatched argument count."}
-                    api_key_input = args[arg_index]
-                    if not api_key_input:
-                         return {
-                            "success": False,
-                            "message": f"Please provide the API key for {platform}"
-                        }
-                    current_keys[platform] = api_key_input
-                    arg_index += 1
-            # else: # If platform not selected, skip its potential args (logic depends on how inputs are structured)
-            # This assumes inputs are *only* passed if the platform is selected, which needs careful handling in UI binding.
-            # A safer approach is to always pass all inputs and ignore them here if not selected. Let's refine the input gathering.
-
-        # Re-filter based on current selection state, *after* parsing args
-        selected_api_keys = {
-            platform: current_keys[platform]
-            for platform in PLATFORMS
-            if self.selected_platforms[platform] and platform in current_keys
-        }
+                    message = f"Please provide the API key for {platform}"
+                return {"success": False, "message": message}
+            # X (Twitter)'s four fields are stored as "key,secret,token,token_secret"
+            selected_api_keys[platform] = ",".join(values)
 
 
         if not selected_api_keys:
@@ -195,13 +243,13 @@ class SimulpostApp:
         # Get list of selected platforms *that have keys saved*
         saved_keys = load_api_keys()
         platforms_to_authorize = [
-             p for p in PLATFORMS
-             if self.selected_platforms[p] and p in saved_keys
+             p for p in _platforms_in(self._selected_mask)
+             if p in saved_keys
         ]
 
         if not platforms_to_authorize:
              # Check if platforms are selected but keys are missing
-             selected_but_no_keys = [p for p in PLATFORMS if self.selected_platforms[p] and p not in saved_keys]
+             selected_but_no_keys = [p for p in _platforms_in(self._selected_mask) if p not in saved_keys]
              if selected_but_no_keys:
                  return {
                     "success": False,
@@ -222,12 +270,14 @@ class SimulpostApp:
         # Update authorized platforms status based on results
         successful_auths = []
         failed_auths = []
+        # Read the statuses *after* authorize_all_platforms which saves tokens, in one batch
+        # This ensures we read the latest state, including successful authorizations
+        final_statuses = check_auth_status_batch(list(results))
         for platform, result in results.items():
-             # Use check_auth_status *after* authorize_all_platforms which saves tokens
-             # This ensures we read the latest state, including successful authorizations
-            final_status = check_auth_status(platform)
-            self.authorized_platforms[platform] = final_status.get("authorized", False)
-            if self.authorized_platforms[platform]:
+            final_status = final_statuses[platform]
+            is_authorized = final_status.get("authorized", False)
+            self._authorized_mask = _mask_with(self._authorized_mask, platform, is_authorized)
+            if is_authorized:
                 successful_auths.append(platform)
             elif platform in platforms_to_authorize: # Only report failure if we attempted to authorize it
                  # Provide more detail if possible
@@ -276,7 +326,7 @@ class SimulpostApp:
             }
 
         # Get list of platforms that are currently authorized
-        platforms_to_post = [p for p in PLATFORMS if self.authorized_platforms[p]]
+        platforms_to_post = _platforms_in(self._authorized_mask)
 
         if not platforms_to_post:
             return {
@@ -319,6 +369,7 @@ class SimulpostApp:
 
     def get_drafts_list(self):
         """Get list of drafts for the dropdown."""
+        import gradio as gr
         drafts = load_drafts()
         # Format for dropdown: list of tuples (display_name, id) or just list of ids
         # Let's use a more descriptive name if possible
@@ -329,11 +380,12 @@ class SimulpostApp:
 
     def load_selected_draft(self, draft_id: str):
         """Load the content of the selected draft."""
+        import gradio as gr
         if not draft_id:
             return "" # No draft selected
 
-        drafts = load_drafts()
-        selected_draft = next((d for d in drafts if d['id'] == draft_id), None)
+        # Read just the selected draft instead of loading and searching them all
+        selected_draft = load_draft(draft_id)
 
         if selected_draft:
             # Update the post text area
@@ -345,25 +397,32 @@ class SimulpostApp:
 
     def handle_save_draft(self, post_text: str):
         """Handle saving a draft and update the drafts list."""
+        import gradio as gr
         if not post_text.strip():
-             return gr.update(value={"success": False, "error": "Cannot save empty draft."}), gr.update() # No change to dropdown
+             return gr.update(value=_status_markdown({"success": False, "error": "Cannot save empty draft."})), gr.update() # No change to dropdown
 
         result = save_draft(post_text) # Assuming save_draft only needs text for now
+        if result.get("success"):
+            result = {**result, "message": f"Draft {result['draft_id']} saved."}
 
         # Refresh the drafts dropdown after saving
         new_drafts_list = self.get_drafts_list()
 
-        return gr.update(value=result), new_drafts_list # Return update for status and dropdown
+        return gr.update(value=_status_markdown(result)), new_drafts_list # Return update for status and dropdown
 
 
     def build_interface(self):
         """Build the complete Gradio interface."""
+        import gradio as gr
         with gr.Blocks(title="Simulpost", theme=gr.themes.Soft()) as interface:
             gr.Markdown("# Simulpost")
             gr.Markdown("Post simultaneously to multiple social media platforms.")
 
             # State variables
             state = gr.State({"current_screen": "api_form"})
+            # Result dicts of the submit handlers, read by the screen transitions
+            api_result = gr.State({})
+            auth_result = gr.State({})
             api_key_inputs_flat = [] # To store all input components for API keys
 
             # --- Screen 1: API Form ---
@@ -377,12 +436,12 @@ class SimulpostApp:
                         with gr.Column(scale=1, min_width=150):
                             platform_checkboxes[platform] = gr.Checkbox(
                                 label=platform,
-                                value=self.selected_platforms[platform],
+                                value=_mask_has(self._selected_mask, platform),
                                 elem_id=f"{platform}_checkbox"
                             )
                         with gr.Column(scale=3):
                              # Group for API inputs - visibility controlled by checkbox
-                             with gr.Group(visible=self.selected_platforms[platform]) as input_group:
+                             with gr.Group(visible=_mask_has(self._selected_mask, platform)) as input_group:
                                 platform_input_groups[platform] = input_group
                                 if platform == "X (Twitter)":
                                     api_key = gr.Textbox(label="API Key", type="password", placeholder="Enter Twitter API Key")
@@ -402,10 +461,12 @@ class SimulpostApp:
 
                 # Link checkboxes to visibility of input groups
                 for platform in PLATFORMS:
+                     # Pure visibility toggle, done in the browser without a server round trip
                      platform_checkboxes[platform].change(
-                         fn=lambda x: gr.update(visible=x),
+                         fn=None,
                          inputs=[platform_checkboxes[platform]],
                          outputs=[platform_input_groups[platform]],
+                         js="(v) => ({__type__: 'update', visible: !!v})",
                          queue=False # Faster UI update
                      )
 
@@ -420,7 +481,7 @@ class SimulpostApp:
                 )
 
                 api_submit_btn = gr.Button("Verify and Save Keys")
-                api_status = gr.JSON(label="API Key Status", visible=False) # Initially hidden
+                api_status = gr.Markdown(visible=False) # Initially hidden
 
                 # Collect checkbox components for the update function
                 checkbox_inputs = [platform_checkboxes[p] for p in PLATFORMS]
@@ -436,7 +497,7 @@ class SimulpostApp:
                 gr.Markdown("## Step 2: Authorize Platforms")
                 auth_platforms_md = gr.Markdown("Checking authorization status...")
                 auth_btn = gr.Button("Authorize Selected Platforms")
-                auth_status = gr.JSON(label="Authorization Status", visible=False) # Initially hidden
+                auth_status = gr.Markdown(visible=False) # Initially hidden
 
             # --- Screen 3: Post Form ---
             with gr.Group(visible=False) as post_form:
@@ -456,15 +517,17 @@ class SimulpostApp:
                     post_btn = gr.Button("Post to Authorized Platforms", variant="primary")
                     save_draft_btn = gr.Button("Save Draft")
 
-                post_status = gr.JSON(label="Posting Status", visible=False) # Initially hidden
-                draft_status = gr.JSON(label="Draft Status", visible=False) # Initially hidden
+                post_status = gr.Markdown(visible=False) # Initially hidden
+                draft_status = gr.Markdown(visible=False) # Initially hidden
 
                 # Back button
                 restart_btn = gr.Button("Start Over / Manage Keys")
 
 
                 # --- Post Form Logic ---
-                post_text.change(fn=lambda x: f"{len(x)} characters", inputs=[post_text], outputs=[char_counter], queue=False)
+                # Counted in the browser, so typing doesn't cost a server round trip per keystroke.
+                # Spreading the string counts code points, matching Python's len() (x.length would count emoji twice)
+                post_text.change(fn=None, inputs=[post_text], outputs=[char_counter], js="(x) => `${[...(x ?? '')].length} characters`", queue=False)
 
                 # Draft loading
                 load_draft_btn.click(
@@ -478,27 +541,47 @@ class SimulpostApp:
                     fn=self.handle_save_draft,
                     inputs=[post_text],
                     outputs=[draft_status, drafts_dropdown] # Update status and dropdown list
-                ).then(lambda: gr.update(visible=True), outputs=[draft_status]) # Show status
+                ).then(lambda: gr.update(visible=True), outputs=[draft_status], queue=False) # Show status
 
 
             # --- Screen Transition Logic ---
 
+            def _after_api_submit(result):
+                """Shows the key status and moves to the auth screen on success."""
+                success = result.get("success", False)
+                platforms = result.get("platforms") or []
+                auth_md = ("Ready to authorize:\n- " + "\n- ".join(platforms)) if success else ""
+                return (
+                    gr.update(value=_status_markdown(result), visible=True), # Show status message
+                    # Switch screen visibility based on success
+                    gr.update(visible=not success), # Hide API form if success
+                    gr.update(visible=success), # Show Auth form if success
+                    gr.update(value=auth_md) # Update markdown in Auth screen
+                )
+
+            def _after_authorize(result):
+                """Shows the auth status and moves to the post screen on success."""
+                success = result.get("success", False)
+                platforms = result.get("platforms") or []
+                post_md = ("Posting to:\n- " + "\n- ".join(platforms)) if success else "No platforms authorized."
+                return (
+                    gr.update(value=_status_markdown(result), visible=True), # Show status
+                    # Switch screen visibility
+                    gr.update(visible=not success), # Hide Auth form if success
+                    gr.update(visible=success), # Show Post form if success
+                    gr.update(value=post_md) # Update markdown in Post screen
+                )
+
             # API Submit -> Auth Screen
             api_submit_btn.click(
                 fn=self.submit_api_keys,
                 inputs=checkbox_inputs + api_key_inputs_flat, # Pass checkboxes first, then all API fields
-                outputs=[api_status]
+                outputs=[api_result]
             ).then(
-                 fn=lambda result: (
-                     gr.update(visible=True), # Show status message
-                     # Switch screen visibility based on success
-                     gr.update(visible=not result.get("success", False)), # Hide API form if success
-                     gr.update(visible=result.get("success", False)), # Show Auth form if success
-                     # Update markdown in Auth screen
-                     gr.update(value=f"Ready to authorize:\n- " + "\n- ".join(result.get("platforms",))) if result.get("success", False) else ""
-                 ),
-                 inputs=[api_status],
-                 outputs=[api_status, api_form, auth_form, auth_platforms_md]
+                 fn=_after_api_submit,
+                 inputs=[api_result],
+                 outputs=[api_status, api_form, auth_form, auth_platforms_md],
+                 queue=False # Screen switch only, no need to wait in the queue
             )
 
 
@@ -506,18 +589,12 @@ class SimulpostApp:
             auth_btn.click(
                 fn=self.authorize_platforms,
                 inputs=[],
-                outputs=[auth_status]
+                outputs=[auth_result]
             ).then(
-                fn=lambda result: (
-                    gr.update(visible=True), # Show status
-                    # Switch screen visibility
-                    gr.update(visible=not result.get("success", False)), # Hide Auth form if success
-                    gr.update(visible=result.get("success", False)), # Show Post form if success
-                    # Update markdown in Post screen
-                     gr.update(value=f"Posting to:\n- " + "\n- ".join(result.get("platforms",))) if result.get("success", False) else "No platforms authorized."
-                ),
-                inputs=[auth_status],
-                outputs=[auth_status, auth_form, post_form, post_platforms_md]
+                fn=_after_authorize,
+                inputs=[auth_result],
+                outputs=[auth_status, auth_form, post_form, post_platforms_md],
+                queue=False # Screen switch only, no need to wait in the queue
             ).then( # Chain another .then to refresh drafts when entering post screen
                 fn=self.get_drafts_list,
                 inputs=[],
@@ -527,17 +604,18 @@ class SimulpostApp:
 
             # Post Submit
             post_btn.click(
-                fn=self.submit_post,
+                fn=lambda text, media: _status_markdown(self.submit_post(text, media)),
                 inputs=[post_text, media_upload],
                 outputs=[post_status]
-            ).then(lambda: gr.update(visible=True), outputs=[post_status]) # Show status
+            ).then(lambda: gr.update(visible=True), outputs=[post_status], queue=False) # Show status
 
 
             # Restart Button -> API Screen
             restart_btn.click(
                 fn=lambda: (gr.update(visible=True), gr.update(visible=False), gr.update(visible=False), # Show API, hide Auth, hide Post
-                           gr.update(value=None), gr.update(value=None), gr.update(value=None)), # Clear statuses
-                outputs=[api_form, auth_form, post_form, api_status, auth_status, post_status]
+                           gr.update(value="", visible=False), gr.update(value="", visible=False), gr.update(value="", visible=False)), # Clear statuses
+                outputs=[api_form, auth_form, post_form, api_status, auth_status, post_status],
+                queue=False
             )
 
 
@@ -0,0 +1,90 @@
+"""
+JSON and file helpers for Simulpost.
+
+Shared by the handler and platform modules, so this module imports none of them.
+"""
+
+import os
+import json
+import tempfile
+from typing import Any, Optional, Tuple
+
+# orjson is optional; it parses/serializes JSON several times faster than the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dump_json(data: Any, indent: bool = False) -> bytes:
+    """Serializes data to JSON bytes (compact unless indent), using orjson when it is installed."""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, indent=2).encode('utf-8')
+    return json.dumps(data, separators=(",", ":")).encode('utf-8')
+
+def load_json(raw: bytes) -> Any:
+    """Parses JSON bytes, using orjson when it is installed."""
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """Returns (mtime_ns, size) of path, which changes whenever it is rewritten, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class FileCache:
+    """
+    Holds a value derived from one file (e.g. its parsed or decrypted contents),
+    reused while the file's stamp is unchanged. Callers copy the value before
+    handing it out if it may be modified.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entry: Tuple[Optional[Tuple[int, int]], Any] = (None, None) # (stamp, value), replaced as a whole
+
+    def lookup(self) -> Tuple[Optional[Tuple[int, int]], Any]:
+        """Returns the file's current stamp and the cached value (None if the file is missing or changed)."""
+        stamp = file_stamp(self.path)
+        cached_stamp, value = self._entry
+        return stamp, (value if stamp is not None and stamp == cached_stamp else None)
+
+    def store(self, stamp: Optional[Tuple[int, int]], value: Any) -> None:
+        """Caches value as derived from the version of the file with the given stamp."""
+        self._entry = (stamp, value)
+
+    def store_written(self, value: Any) -> None:
+        """Caches value as the contents just written to the file, so the next lookup needn't read it back."""
+        self._entry = (file_stamp(self.path), value)
+
+    def invalidate(self) -> None:
+        """Forgets the cached value; call before rewriting the file."""
+        self._entry = (None, None)
+
+def write_atomic(path: str, data: bytes, durable: bool = True) -> None:
+    """
+    Writes data to path via a temporary file and os.replace, so readers
+    (and the mtime caches) only ever see the old or the complete new file.
+    With durable=False the fsync is skipped: the file can still be lost in a
+    power cut, but never left half-written. Each call uses its own temporary
+    file, so concurrent writers of the same path can't clobber each other's.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Don't leave the temporary file behind
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
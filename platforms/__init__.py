@@ -5,15 +5,18 @@ This package contains modules for interacting with different social media platfo
 Each platform module provides functions for API key validation, authorization, and posting.
 """
 
+import importlib
 from typing import List
 
 # List of supported platforms
 SUPPORTED_PLATFORMS = ["X (Twitter)", "Threads", "Bluesky", "Mastodon", "LinkedIn"]
 
-# Import platform modules
-from . import twitter
-# These imports will be uncommented when the modules are implemented
-# from . import threads
-# from . import bluesky
-# from . import mastodon
-# from . import linkedin 
\ No newline at end of file
+# Platform modules, imported on first access (PEP 562) so importing the package stays cheap
+_PLATFORM_MODULES = {"twitter"}
+# These will be added when the modules are implemented
+# "threads", "bluesky", "mastodon", "linkedin"
+
+def __getattr__(name: str):
+    if name in _PLATFORM_MODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")